@@ -0,0 +1,41 @@
+"""Optionally compiles hot pure-Python modules with Cython, in place.
+
+This is opt-in, and not part of the package build. Run:
+
+    pip install cython setuptools
+    python build.py
+
+The modules are compiled as-is (Cython's pure Python mode), so the
+compiled extension shadows the `.py` source while it exists. Deleting
+the built `easy_slurm/*.so` reverts to the pure-Python modules.
+"""
+
+import sys
+
+from Cython.Build import cythonize
+from setuptools import setup
+
+CYTHON_MODULES = ["easy_slurm/format.py"]
+
+
+def main():
+    # Annotations are documentation here, not C types: e.g. `dict`
+    # would otherwise reject the mapping types format_with_config
+    # accepts.
+    ext_modules = cythonize(
+        CYTHON_MODULES,
+        compiler_directives={
+            "language_level": "3",
+            "annotation_typing": False,
+            "binding": True,
+        },
+    )
+    setup(
+        name="easy-slurm",
+        ext_modules=ext_modules,
+        script_args=sys.argv[1:] or ["build_ext", "--inplace"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -33,15 +33,21 @@ completed/incomplete
 If the current run successfully completes, `status` ends with
 `completed`. Otherwise, if it is interrupted, `status` includes
 `interrupting` and ends with `incomplete`.
+
+To spare the shared filesystem, `$JOB_DIR/status` is only updated at
+phase boundaries, so it skips the `running` (and `interacting`) states.
+Every state is recorded in `$SLURM_TMPDIR/status` on the compute node.
 """
 
 __version__ = "0.2.1"
 
 from .format import format_with_config
 from .jobs import (
+    clear_archive_cache,
     create_job_dir,
     create_job_interactive_script_source,
     create_job_script_source,
     submit_job,
     submit_job_dir,
+    submit_jobs_batch,
 )
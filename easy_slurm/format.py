@@ -1,6 +1,11 @@
 import re
 from datetime import datetime
-from typing import Any, Optional, Sequence
+from functools import lru_cache
+from typing import Any, Callable, Optional, Sequence
+
+_PLACEHOLDER_RE = re.compile(r"\{[^\}]*\}")
+_WIDTH_RE = re.compile(r"%(\d)([a-zA-Z])")
+_SIZED_RE = re.compile("\ue000(\\d)([^\ue001]*)\ue001")
 
 
 def format_with_config(
@@ -50,24 +55,56 @@ def format_with_config(
         >>> fmt = "{date:%Y-%m-%d_%H-%M-%S_%3f}_bs={hp.batch_size}"
         >>> format_with_config(fmt, config, _now=now)
         '2020-01-01_00-00-03_141_bs=32'
+        >>> format_with_config("{a{{b}", {}, silent=True)
+        '{a{b}'
     """
     if _now is None:
         _now = datetime.now()
 
-    template = encode_pair("{{", "}}", 2, template)
-    matches = list(re.finditer(r"\{[^\}]*\}", template))
-    spans = [match.span() for match in matches]
-    spans = [(0, 0)] + spans + [(len(template), len(template))]
-    formatted_result = "".join(
-        x
-        for (l1, r1), (l2, _) in zip(spans[:-1], spans[1:])
-        for x in [
-            _format_term(template[l1:r1], config, now=_now, silent=silent),
-            template[r1:l2],
-        ]
-    )
-    formatted_result = decode_pair("{", "}", 2, formatted_result)
-    return formatted_result
+    return _compile_template(template)(config, _now, silent)
+
+
+@lru_cache(maxsize=256)
+def _compile_template(
+    template: str,
+) -> Callable[[dict[str, Any], datetime, bool], str]:
+    """Compiles template into a function of `(config, now, silent)`.
+
+    The template is split into literal segments (with `{{`/`}}` escapes
+    already decoded) and terms once, so that repeated formatting of the
+    same template only needs to format the terms.
+    """
+    # Most templates (e.g. job directories) contain no escaped braces.
+    is_escaped = "{{" in template or "}}" in template
+
+    def decode(literal: str) -> str:
+        return decode_pair("{", "}", 2, literal) if is_escaped else literal
+
+    if is_escaped:
+        template = encode_pair("{{", "}}", 2, template)
+    literals = []
+    terms = []
+    pos = 0
+    for match in _PLACEHOLDER_RE.finditer(template):
+        literals.append(decode(template[pos : match.start()]))
+        terms.append(match.group(0))
+        pos = match.end()
+    last_literal = decode(template[pos:])
+
+    def format_compiled(
+        config: dict[str, Any], now: datetime, silent: bool
+    ) -> str:
+        parts = []
+        for literal, term in zip(literals, terms):
+            parts.append(literal)
+            # Decoded, since silent terms are passed through verbatim.
+            parts.append(
+                decode(_format_term(term, config, now=now, silent=silent))
+            )
+        parts.append(last_literal)
+        return "".join(parts)
+
+    return format_compiled
 
 
 def dict_get(d: dict[str, Any], path_seq: Sequence[str]) -> Any:
@@ -78,6 +115,14 @@ def dict_get(d: dict[str, Any], path_seq: Sequence[str]) -> Any:
         >>> dict_get(config, "hp.batch_size".split("."))
         32
     """
+    # Unrolled fast paths for typical shallow keys.
+    n = len(path_seq)
+    if n == 1:
+        return d[path_seq[0]]
+    if n == 2:
+        return d[path_seq[0]][path_seq[1]]
+    if n == 3:
+        return d[path_seq[0]][path_seq[1]][path_seq[2]]
     for key in path_seq:
         d = d[key]
     return d
@@ -99,20 +144,28 @@ def dict_set(d: dict[str, Any], path_seq: Sequence[str], value: Any):
 
 def encode_pair(left: str, right: str, rep: int, s: str) -> str:
     """Encodes a left/right pair using temporary characters."""
-    return (
-        s.replace("", "")
-        .replace(left, "\ufffe" * rep)
-        .replace(right, "\uffff" * rep)
-    )
+    return _replace_pair(left, right, "\ufffe" * rep, "\uffff" * rep, s)
 
 
 def decode_pair(left: str, right: str, rep: int, s: str) -> str:
     """Decodes a left/right pair using temporary characters."""
-    return (
-        s.replace("", "")
-        .replace("\ufffe" * rep, left)
-        .replace("\uffff" * rep, right)
-    )
+    return _replace_pair("\ufffe" * rep, "\uffff" * rep, left, right, s)
+
+
+def _replace_pair(
+    left: str, right: str, new_left: str, new_right: str, s: str
+) -> str:
+    """Replaces occurrences of left and right in a single pass."""
+    if left not in s and right not in s:
+        return s
+    replacements = {left: new_left, right: new_right}
+    pattern = _pair_pattern(left, right)
+    return pattern.sub(lambda m: replacements[m.group(0)], s)
+
+
+@lru_cache(maxsize=None)
+def _pair_pattern(left: str, right: str) -> re.Pattern:
+    return re.compile(f"{re.escape(left)}|{re.escape(right)}")
 
 
 def _format_term(
@@ -125,9 +178,9 @@ def _format_term(
         >>> date_string = "2020-01-01 00:00:03.141592"
         >>> now = datetime.strptime(date_string, "%Y-%m-%d %H:%M:%S.%f")
         >>> config = {"hp": {"batch_size": 32, "lr": 1e-2}}
-        >>> _format_term("{hp.batch_size:04}", config)
+        >>> _format_term("{hp.batch_size:04}", config, now=now)
         '0032'
-        >>> _format_term("{hp.lr:.1e}", config)
+        >>> _format_term("{hp.lr:.1e}", config, now=now)
         '1.0e-02'
         >>> _format_term("{date:%Y-%m-%d_%H-%M-%S_%3f}", config, now=now)
         '2020-01-01_00-00-03_141'
@@ -135,16 +188,14 @@ def _format_term(
     if term == "":
         return ""
 
-    key, *opt = term[1:-1].split(":", maxsplit=1)
+    key, path_seq, format_spec, fmt = _parse_term(term)
 
     if key == "date":
-        fmt = opt[0] if len(opt) != 0 else "%Y-%m-%d_%H-%M-%S_%3f"
+        fmt = "%Y-%m-%d_%H-%M-%S_%3f" if format_spec is None else format_spec
         return _strftime(fmt, now)
 
-    fmt = "{}" if len(opt) == 0 else f"{{:{opt[0]}}}"
-
     try:
-        value = dict_get(config, key.split("."))
+        value = dict_get(config, path_seq)
     except KeyError as e:
         if silent:
             return term
@@ -153,6 +204,24 @@ def _format_term(
     return fmt.format(value)
 
 
+@lru_cache(maxsize=1024)
+def _parse_term(
+    term: str,
+) -> tuple[str, tuple[str, ...], Optional[str], str]:
+    """Parses term into key, key path, format spec, and format string.
+
+    Examples:
+        >>> _parse_term("{hp.batch_size:04}")
+        ('hp.batch_size', ('hp', 'batch_size'), '04', '{:04}')
+        >>> _parse_term("{date}")
+        ('date', ('date',), None, '{}')
+    """
+    key, *opt = term[1:-1].split(":", maxsplit=1)
+    format_spec = opt[0] if len(opt) != 0 else None
+    fmt = "{}" if format_spec is None else f"{{:{format_spec}}}"
+    return key, tuple(key.split(".")), format_spec, fmt
+
+
 def _strftime(fmt: str, dt: datetime) -> str:
     """Formats via strftime, but also supports width specifiers.
 
@@ -169,16 +238,12 @@ def _strftime(fmt: str, dt: datetime) -> str:
         >>> _strftime("%Y-%m-%d %H:%M:%S.%3f", dt)
         '2020-01-01 00:00:03.141'
     """
-    tokens = fmt.split("%")
-    tokens[1:] = [_strftime_format_token(dt, x) for x in tokens[1:]]
-    return "".join(tokens)
-
-
-def _strftime_format_token(dt: datetime, token: str) -> str:
-    if len(token) == 0:
-        return ""
-    if token[0].isnumeric():
-        width = int(token[0])
-        s = dt.strftime(f"%{token[1]}")[:width]
-        return f"{s}{token[2:]}"
-    return dt.strftime(f"%{token}")
+    if _WIDTH_RE.search(fmt) is None:
+        return dt.strftime(fmt)
+
+    # Wrap sized directives in private-use markers, so that a single
+    # strftime call suffices, and truncate the marked spans afterwards.
+    sized_fmt = _WIDTH_RE.sub("\ue000\\1%\\2\ue001", fmt)
+    return _SIZED_RE.sub(
+        lambda m: m.group(2)[: int(m.group(1))], dt.strftime(sized_fmt)
+    )
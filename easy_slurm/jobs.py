@@ -1,19 +1,53 @@
+import hashlib
 import os
 import re
+import shutil
 import stat
 import subprocess
-from textwrap import dedent, indent
-from typing import Any
+import tarfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Hashable, Optional, Sequence
 
 from . import __version__
 from .format import format_with_config
-from .templates import (
-    EXTRACT_RESULTS,
-    JOB_INTERACTIVE_TEMPLATE,
-    JOB_SCRIPT_TEMPLATE,
-    SAVE_RESULTS,
-    VARS_TEMPLATE,
-)
+from . import templates
+from .templates import EXTRACT_RESULTS, SAVE_RESULTS, VARS_TEMPLATE
+
+ARCHIVE_EXTENSIONS = {"gzip": ".tar.gz", "zstd": ".tar.zst", "none": ".tar"}
+
+# Maximum number of archives kept in the archive cache (see
+# `submit_job`'s `cache_archives`).
+ARCHIVE_CACHE_SIZE = 16
+
+# sbatch long options and their `pyslurm.JobSubmitDescription` fields.
+_PYSLURM_OPTIONS = {
+    "account": "account",
+    "constraint": "constraints",
+    "cpus-per-task": "cpus_per_task",
+    "error": "standard_error",
+    "gres": "gres_per_node",
+    "job-name": "name",
+    "mem": "memory_per_node",
+    "mem-per-cpu": "memory_per_cpu",
+    "nodes": "nodes",
+    "ntasks": "ntasks",
+    "ntasks-per-node": "ntasks_per_node",
+    "output": "standard_output",
+    "partition": "partition",
+    "qos": "qos",
+    "signal": "signal",
+    "time": "time_limit",
+}
+
+_SBATCH_OPTION_RE = re.compile(r"^#SBATCH --([^=\s]+)=(.*)$")
+_SINGLE_QUOTES_RE = re.compile(r"'+")
+
+_last_now_ns = 0
+_now_lock = threading.Lock()
 
 
 def submit_job(
@@ -33,6 +67,13 @@ def submit_job(
     interactive: bool = False,
     resubmit_limit: int = 64,
     results_sync_method: str = "symlink",
+    compression: str = "zstd",
+    multinode: bool = False,
+    dataset_async: bool = False,
+    backend: str = "cli",
+    cache_archives: bool = True,
+    _now: Optional[datetime] = None,
+    _archives: Optional["_OnceMemo"] = None,
 ) -> str:
     """Submits job.
 
@@ -94,20 +135,93 @@ def submit_job(
             Default is 64 resubmissions.
         results_sync_method (str):
             Choices: "rsync", "symlink", or "targz".
-             - rsync: Sync results directory via rsync.
+             - rsync: Sync results directory via rsync. Only changed
+               blocks of files are transferred, written in place.
+               Note that a sync killed midway may leave a partially
+               updated file in `$JOB_DIR/results`.
              - symlink: Directly symlink results directory.
              - targz: Extract/archive results directory into .tar.gz.
+               This is the slow path: the whole directory is compressed
+               within the cleanup window (using `pigz` if available).
             Default is `"symlink"`.
+        compression (str):
+            Choices: "gzip", "zstd", or "none".
+            Compression used for the `src` and `assets` archives.
+             - gzip: Compress at level 1 with `pigz` (parallel) if
+               available, otherwise in-process. Level 1 is several
+               times faster than the default level 6, and only a few
+               percent larger.
+             - zstd: Compress with multithreaded `zstd`, which is
+               several times faster than gzip at a similar ratio.
+               Level and threads default to `ZSTD_CLEVEL=3` and
+               `ZSTD_NBTHREADS=0` (all cores) unless set in the
+               environment. Falls back to gzip if `zstd` is not
+               installed. Extraction on the compute node requires
+               GNU tar >= 1.31 and `zstd`.
+             - none: Plain `.tar`, for when compression costs more
+               than it saves (e.g. fast shared filesystems).
+            Default is `"zstd"`.
+        multinode (bool):
+            Stage `src`, `assets`, and `dataset` onto every node of the
+            allocation. Archives are broadcast once via `sbcast` and
+            extracted node-locally, rather than each node reading them
+            from the shared filesystem. Default is `False`.
+        dataset_async (bool):
+            `dataset` is always extracted in the background while `src`
+            and `assets` are extracted, and waited for right before the
+            "setup" stage. If `True`, keep extracting it while "setup"
+            runs too, and only wait right before the "on_run" stage.
+            Only enable this if `setup` does not read the dataset.
+            Default is `False`.
+        backend (str):
+            Choices: "cli" or "pyslurm".
+             - cli: Submit by running `sbatch`.
+             - pyslurm: Submit in-process via `pyslurm` (>= 23), avoiding
+               a subprocess per job. Only common sbatch options are
+               supported (see `_PYSLURM_OPTIONS`); others raise a
+               `ValueError` before the job directory is created.
+               Falls back to "cli" if `pyslurm` is not installed or
+               too old.
+            Default is `"cli"`.
+        cache_archives (bool):
+            Reuse previously built `src`/`assets` archives if the
+            directory contents (paths, sizes, mtimes) are unchanged.
+            Archives are hardlinked into
+            `$XDG_CACHE_HOME/easy_slurm/archives` (`~/.cache` by
+            default), which only works if it is on the same filesystem
+            as `$JOB_DIR`. Only the `ARCHIVE_CACHE_SIZE` (16) most
+            recently used archives are kept; `clear_archive_cache()`
+            removes them all.
+            Default is `True`.
 
     Returns:
         Path to the newly created job directory.
     """
+    _check_backend(backend)
+    if backend == "pyslurm":
+        _pyslurm_job_options(sbatch_options)
+
+    if _now is None:
+        _now = _unique_now()
+
     job_name = sbatch_options.get("job-name", "untitled")
-    job_dir = format_with_config(job_dir, {"job_name": job_name})
+    job_dir = format_with_config(job_dir, {"job_name": job_name}, _now=_now)
     job_dir = _expand_path(job_dir)
-    create_job_dir(job_dir, src, assets)
-
+    src = _expand_path(src)
+    assets = _expand_path(assets)
+    dataset = _expand_path(dataset)
+    compression = _resolve_compression(compression)
     job_path = f"{job_dir}/job.sh"
+    job_interactive_path = f"{job_dir}/job_interactive.sh"
+    create_job_dir(
+        job_dir,
+        src,
+        assets,
+        compression,
+        cache_archives,
+        _archives=_archives,
+    )
+
     job_script_str = create_job_script_source(
         sbatch_options=sbatch_options,
         on_run=on_run,
@@ -120,10 +234,12 @@ def submit_job(
         cleanup_seconds=cleanup_seconds,
         resubmit_limit=resubmit_limit,
         results_sync_method=results_sync_method,
+        compression=compression,
+        multinode=multinode,
+        dataset_async=dataset_async,
     )
     _write_script(job_path, job_script_str)
 
-    job_interactive_path = f"{job_dir}/job_interactive.sh"
     job_interactive_script_str = create_job_interactive_script_source(
         sbatch_options=sbatch_options,
         job_path=job_path,
@@ -133,7 +249,110 @@ def submit_job(
     _write_script(job_interactive_path, job_interactive_script_str)
 
     if submit:
-        submit_job_dir(job_dir, interactive)
+        submit_job_dir(job_dir, interactive, backend)
+
+    return job_dir
+
+
+def submit_jobs_batch(
+    job_dir: str,
+    job_specs: Sequence[dict[str, Any]],
+    *,
+    submit: bool = True,
+    max_concurrent_tasks: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> str:
+    """Submits many jobs at once using Slurm job arrays.
+
+    Each job is created in its own `$JOB_DIR/tasks/{i}` directory,
+    exactly as `submit_job` would. Jobs sharing the same sbatch options
+    (ignoring `job-name`) are then submitted together via a single
+    `sbatch --array` call, which amortizes submission overhead.
+    Jobs that time out are resubmitted individually.
+
+    Args:
+        job_dir (str):
+            Path to directory containing the `tasks` directories and the
+            array dispatcher script `job_array.sh`.
+            Formatted like in `submit_job`, using the first job's name.
+        job_specs (Sequence[dict[str, Any]]):
+            Keyword arguments for `submit_job`, one dict per job.
+            Must not contain `job_dir`, `submit`, `interactive`, or
+            `backend`, since job arrays are always submitted via
+            `sbatch`.
+        submit (bool):
+            Submit created jobs to scheduler. Default is `True`.
+        max_concurrent_tasks (Optional[int]):
+            Maximum number of tasks of each array allowed to run at
+            once (`sbatch --array=...%N`), e.g. to avoid flooding the
+            cluster during a large sweep.
+            Default is `None` (no limit).
+        max_workers (Optional[int]):
+            Number of threads used to create the task directories
+            concurrently. Default is `None`, which uses the
+            `concurrent.futures.ThreadPoolExecutor` default.
+
+    Returns:
+        Path to the newly created batch directory.
+
+    Examples:
+        >>> submit_jobs_batch("/tmp/jobs/{date}", [])
+        Traceback (most recent call last):
+            ...
+        ValueError: job_specs must not be empty.
+    """
+    if len(job_specs) == 0:
+        raise ValueError("job_specs must not be empty.")
+    if any("backend" in job_spec for job_spec in job_specs):
+        raise ValueError(
+            "job_specs must not contain backend: "
+            "job arrays are always submitted via sbatch."
+        )
+
+    sbatch_options = job_specs[0].get("sbatch_options", {})
+    now = _unique_now()
+    job_name = sbatch_options.get("job-name", "untitled")
+    job_dir = format_with_config(job_dir, {"job_name": job_name}, _now=now)
+    job_dir = _expand_path(job_dir)
+
+    # Tasks usually share src and assets, so fingerprint and archive
+    # each tree only once, even though tasks are created concurrently.
+    archives = _OnceMemo()
+
+    def create_task(i: int, job_spec: dict[str, Any]) -> dict[str, str]:
+        task_dir = f"{job_dir}/tasks/{i}"
+        submit_job(
+            task_dir,
+            **job_spec,
+            submit=False,
+            _now=now,
+            _archives=archives,
+        )
+        return _read_sbatch_options(f"{task_dir}/job.sh")
+
+    # Task creation is dominated by archiving subprocesses and file I/O.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(create_task, i, job_spec)
+            for i, job_spec in enumerate(job_specs)
+        ]
+        task_options = [future.result() for future in futures]
+
+    groups: dict[tuple[tuple[str, str], ...], list[int]] = {}
+    for i, options in enumerate(task_options):
+        ignored = ("job-name", "output")
+        key = tuple((k, v) for k, v in options.items() if k not in ignored)
+        groups.setdefault(key, []).append(i)
+
+    job_array_path = f"{job_dir}/job_array.sh"
+    job_array_script_str = templates.JOB_ARRAY_TEMPLATE.substitute(
+        job_dir=job_dir
+    )
+    _write_script(job_array_path, job_array_script_str)
+
+    if submit:
+        for indices in groups.values():
+            _submit_job_array(job_dir, indices, max_concurrent_tasks)
 
     return job_dir
 
@@ -150,6 +369,9 @@ def create_job_script_source(
     cleanup_seconds: int,
     resubmit_limit: int,
     results_sync_method: str,
+    compression: str = "gzip",
+    multinode: bool = False,
+    dataset_async: bool = False,
 ) -> str:
     """Returns source for job script."""
     job_dir = _expand_path(job_dir)
@@ -160,6 +382,9 @@ def create_job_script_source(
         job_dir=job_dir,
         dataset_path=dataset,
         resubmit_limit=resubmit_limit,
+        archive_ext=ARCHIVE_EXTENSIONS[compression],
+        multinode=str(multinode).lower(),
+        dataset_async=str(dataset_async).lower(),
     )
 
     extract_results = EXTRACT_RESULTS[results_sync_method]
@@ -179,7 +404,7 @@ def create_job_script_source(
         sbatch_options, job_dir, cleanup_seconds
     )
 
-    return JOB_SCRIPT_TEMPLATE.format(
+    return templates.JOB_SCRIPT_TEMPLATE.substitute(
         sbatch_options_str=sbatch_options_str,
         vars_str=vars_str,
         on_run=on_run,
@@ -206,7 +431,7 @@ def create_job_interactive_script_source(
         sbatch_options, job_dir, cleanup_seconds
     )
 
-    return JOB_INTERACTIVE_TEMPLATE.format(
+    return templates.JOB_INTERACTIVE_TEMPLATE.substitute(
         sbatch_options_str=sbatch_options_str,
         job_path=job_path,
     )
@@ -216,25 +441,49 @@ def create_job_dir(
     job_dir: str,
     src: str,
     assets: str,
+    compression: str = "gzip",
+    cache_archives: bool = True,
+    _archives: Optional["_OnceMemo"] = None,
 ):
     """Creates job directory and freezes all necessary files."""
     job_dir = _expand_path(job_dir)
     src = _expand_path(src)
     assets = _expand_path(assets)
+    ext = ARCHIVE_EXTENSIONS[compression]
+    if cache_archives:
+        create_tar_dir = partial(_create_tar_dir_cached, archives=_archives)
+    else:
+        create_tar_dir = _create_tar_dir
 
     os.makedirs(job_dir, exist_ok=True)
-    if src != "":
-        _create_tar_dir(src, f"{job_dir}/src.tar.gz", "src")
-    if assets != "":
-        _create_tar_dir(assets, f"{job_dir}/assets.tar.gz", "assets")
 
-    with open(f"{job_dir}/status", "w") as f:
-        print("status=new", file=f)
-        print(f"easy_slurm_version={__version__}", file=f)
-        print("resubmit_count=0", file=f)
+    # Archives are independent, so build them concurrently. Both the
+    # subprocess pipelines and tarfile's zlib compression release the
+    # GIL while they work.
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(
+                create_tar_dir,
+                path,
+                f"{job_dir}/{name}{ext}",
+                name,
+                compression,
+            )
+            for path, name in [(src, "src"), (assets, "assets")]
+            if path != ""
+        ]
+        for future in futures:
+            future.result()
+
+    _write_file(
+        f"{job_dir}/status",
+        "status=new\n"
+        f"easy_slurm_version={__version__}\n"
+        "resubmit_count=0\n",
+    )
 
 
-def submit_job_dir(job_dir: str, interactive: bool):
+def submit_job_dir(job_dir: str, interactive: bool, backend: str = "cli"):
     """Submits a `$JOB_DIR` created by easy_slurm to slurm.
 
     Note that `submit_job` already does this for the user,
@@ -248,54 +497,464 @@ def submit_job_dir(job_dir: str, interactive: bool):
             text=True,
         )
     else:
-        job_path = f"{job_dir}/job.sh"
-        result = subprocess.run(
-            ["sbatch", job_path],
-            check=True,
-            capture_output=True,
-            text=True,
+        job_id = _submit_batch_job(f"{job_dir}/job.sh", backend)
+
+        _write_file(f"{job_dir}/job_ids", f"{job_id}\n")
+
+
+def _submit_job_array(
+    job_dir: str,
+    indices: Sequence[int],
+    max_concurrent_tasks: Optional[int] = None,
+):
+    """Submits the given tasks of a batch directory as a job array."""
+    tasks_dir = f"{job_dir}/tasks"
+    options = _read_sbatch_options(f"{tasks_dir}/{indices[0]}/job.sh")
+    options["output"] = f"{tasks_dir}/%a/slurm_jobid%j_%x.out"
+    array = ",".join(map(str, indices))
+    if max_concurrent_tasks is not None:
+        array = f"{array}%{max_concurrent_tasks}"
+    job_id = _sbatch(
+        [f"--array={array}"]
+        + [f"--{k}={v}" for k, v in options.items()]
+        + [f"{job_dir}/job_array.sh"]
+    )
+
+    for i in indices:
+        _write_file(f"{tasks_dir}/{i}/job_ids", f"{job_id}_{i}\n")
+
+
+def _submit_batch_job(job_path: str, backend: str) -> int:
+    """Submits job script and returns the submitted job ID."""
+    _check_backend(backend)
+    if backend == "pyslurm":
+        try:
+            from pyslurm import JobSubmitDescription
+        except ImportError:
+            # Legacy pyslurm (< 23) cannot express all options, e.g. the
+            # batch shell signal `B:USR1@N`, so use the CLI instead.
+            pass
+        else:
+            job_opts = _pyslurm_job_options(_read_sbatch_options(job_path))
+            desc = JobSubmitDescription(
+                script=job_path, environment=dict(os.environ), **job_opts
+            )
+            return int(desc.submit())
+    return _sbatch([job_path])
+
+
+def _check_backend(backend: str):
+    if backend not in ("cli", "pyslurm"):
+        raise ValueError(
+            f'Unknown backend {backend!r}. Choices: "cli", "pyslurm".'
         )
 
-        m = re.match(r"^Submitted batch job (\d+)$", result.stdout)
-        job_id = int(m.group(1))
 
-        with open(f"{job_dir}/job_ids", "w") as f:
-            print(job_id, file=f)
+def _pyslurm_job_options(options: dict[str, str]) -> dict[str, str]:
+    """Maps sbatch options to `pyslurm.JobSubmitDescription` fields."""
+    unsupported = [k for k in options if k not in _PYSLURM_OPTIONS]
+    if unsupported:
+        raise ValueError(
+            f"sbatch options not supported by the pyslurm backend: "
+            f"{', '.join(unsupported)}. Use backend=\"cli\" instead."
+        )
+    return {_PYSLURM_OPTIONS[k]: v for k, v in options.items()}
+
+
+def _sbatch(args: Sequence[str]) -> int:
+    """Runs sbatch and returns the submitted job ID."""
+    result = subprocess.run(
+        ["sbatch", "--parsable", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    # Parsable output is "jobid" or "jobid;cluster".
+    return int(result.stdout.strip().partition(";")[0])
+
+
+def _read_sbatch_options(job_path: str) -> dict[str, str]:
+    r"""Reads `#SBATCH --key=value` options from a job script.
+
+    Examples:
+        >>> import os, tempfile
+        >>> with tempfile.NamedTemporaryFile("w", delete=False) as f:
+        ...     _ = f.write("#!/bin/bash\n#SBATCH --time=1:00:00\n")
+        ...     _ = f.write("#SBATCH --job-name=x\necho hi\n")
+        >>> _read_sbatch_options(f.name)
+        {'time': '1:00:00', 'job-name': 'x'}
+        >>> os.remove(f.name)
+    """
+    with open(job_path) as f:
+        matches = (_SBATCH_OPTION_RE.match(line) for line in f)
+        return dict(m.groups() for m in matches if m is not None)
+
+
+def _unique_now() -> datetime:
+    """Returns current time, at least 1 ms later than the previous call.
+
+    This keeps `{date}`-stamped job directories distinct even when jobs
+    are submitted faster than the millisecond resolution of `{date}`.
+    """
+    global _last_now_ns
+    with _now_lock:
+        now_ns = max(time.time_ns(), _last_now_ns + 1_000_000)
+        _last_now_ns = now_ns
+    seconds, ns = divmod(now_ns, 10**9)
+    return datetime.fromtimestamp(seconds).replace(microsecond=ns // 1000)
 
 
 def _expand_path(path: str) -> str:
-    return "" if path == "" else os.path.abspath(os.path.expandvars(path))
+    if path == "":
+        return ""
+    if "$" in path:
+        path = os.path.expandvars(path)
+    return os.path.abspath(path)
+
+
+def _resolve_compression(compression: str) -> str:
+    """Falls back to gzip if the requested compressor is missing."""
+    if compression == "zstd" and shutil.which("zstd") is None:
+        return "gzip"
+    return compression
+
+
+def _compress_args(compression: str) -> list[str]:
+    """Returns argv of the compressor to pipe tar output through."""
+    if compression == "gzip":
+        pigz = shutil.which("pigz")
+        if pigz is not None:
+            return [pigz, "-1", "-p", str(os.cpu_count() or 1)]
+        return [shutil.which("gzip") or "gzip", "-1"]
+    if compression == "zstd":
+        return [shutil.which("zstd") or "zstd"]
+    return []
+
+
+def _compress_env(compression: str) -> dict[str, str]:
+    """Returns compressor environment, with user overrides respected."""
+    if compression == "zstd":
+        return {"ZSTD_CLEVEL": "3", "ZSTD_NBTHREADS": "0", **os.environ}
+    return dict(os.environ)
+
+
+def _create_tar_dir(src, dst, root_name, compression="gzip"):
+    # Unique temporary name, since concurrent submissions may be
+    # populating the same cached archive.
+    tmp_dst = f"{dst}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        if _tar_in_process(compression):
+            _create_tar_dir_in_process(src, tmp_dst, root_name, compression)
+        else:
+            _create_tar_dir_pipeline(src, tmp_dst, root_name, compression)
+    except BaseException:
+        if os.path.lexists(tmp_dst):
+            os.remove(tmp_dst)
+        raise
+
+    os.replace(tmp_dst, dst)
+
+
+def _tar_in_process(compression: str) -> bool:
+    """Whether archiving in-process beats spawning tar and a compressor.
+
+    Only multithreaded compressors (pigz, zstd) are worth the process
+    spawns; single-threaded gzip and plain tar are done via `tarfile`.
+    """
+    if compression == "gzip":
+        return shutil.which("pigz") is None
+    return compression == "none"
+
+
+def _create_tar_dir_in_process(src, dst, root_name, compression="gzip"):
+    if compression == "gzip":
+        tar = tarfile.open(dst, "w:gz", compresslevel=1)
+    else:
+        tar = tarfile.open(dst, "w")
+    with tar:
+        tar.add(src, arcname=root_name)
 
 
-def _create_tar_dir(src, dst, root_name):
+def _create_tar_dir_pipeline(src, dst, root_name, compression="gzip"):
     transform = fr"s/^\./{root_name}/"
-    subprocess.run(
-        ["tar", "czf", dst, "-C", src, ".", "--transform", transform],
-        check=True,
+    tar_args = [shutil.which("tar") or "tar", "-C", src, "-cf", "-", "."]
+    tar_args += ["--transform", transform]
+    compress_args = _compress_args(compression)
+
+    # Absolute executable paths and close_fds=False let CPython launch
+    # the children via posix_spawn instead of fork+exec.
+    # Tar traversal and compression overlap through the pipe.
+    with open(dst, "wb") as f:
+        if compress_args:
+            tar = subprocess.Popen(
+                tar_args, stdout=subprocess.PIPE, close_fds=False
+            )
+            compress = subprocess.Popen(
+                compress_args,
+                stdin=tar.stdout,
+                stdout=f,
+                close_fds=False,
+                env=_compress_env(compression),
+            )
+            tar.stdout.close()
+            procs = [tar, compress]
+        else:
+            procs = [subprocess.Popen(tar_args, stdout=f, close_fds=False)]
+
+        for proc in procs:
+            proc.wait()
+
+    for proc in procs:
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, proc.args)
+
+
+def _create_tar_dir_cached(
+    src, dst, root_name, compression="gzip", archives=None
+):
+    """Creates archive, reusing a cached copy if `src` is unchanged.
+
+    If given, `archives` memoizes the archive found or built for `src`
+    by the first call, so that concurrent calls link to it instead of
+    each fingerprinting `src` and building their own.
+    """
+    if archives is None:
+        archive = _find_or_build_archive(src, dst, root_name, compression)
+    else:
+        archive = archives.get(
+            (src, root_name, compression),
+            _find_or_build_archive,
+            src,
+            dst,
+            root_name,
+            compression,
+        )
+
+    if archive == dst:
+        return
+    try:
+        _link_or_copy(archive, dst)
+    except OSError:
+        # E.g. evicted from the cache concurrently, so rebuild.
+        _create_tar_dir(src, dst, root_name, compression)
+
+
+def _find_or_build_archive(src, dst, root_name, compression) -> str:
+    """Returns path to a cached archive of `src`, or builds it at `dst`."""
+    fingerprint = _dir_fingerprint(src, root_name, compression)
+    ext = ARCHIVE_EXTENSIONS[compression]
+    cached = f"{_archive_cache_dir()}/{fingerprint}{ext}"
+
+    try:
+        os.utime(cached)  # Mark as recently used.
+        return cached
+    except OSError:
+        pass
+
+    _create_tar_dir(src, dst, root_name, compression)
+    _add_to_archive_cache(dst, cached)
+    return dst
+
+
+def _link_or_copy(src: str, dst: str):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def _add_to_archive_cache(path: str, cached: str):
+    """Hardlinks a freshly built archive into the cache.
+
+    Archives on a different filesystem than the cache are not cached,
+    rather than written a second time. Only the `ARCHIVE_CACHE_SIZE`
+    most recently used archives are kept.
+
+    Cache upkeep is best-effort, and never fails the submission, even
+    when other threads or processes are pruning the same cache.
+
+    Examples:
+        Concurrent submissions against a full cache:
+
+        >>> import tempfile
+        >>> from unittest import mock
+        >>> tmp = tempfile.mkdtemp()
+        >>> def submit(i):
+        ...     src = f"{tmp}/src{i}"
+        ...     os.makedirs(src)
+        ...     open(f"{src}/main.py", "w").close()
+        ...     submit_job(f"{tmp}/job{i}", src=src, assets=src, submit=False)
+        >>> cache_home = {"XDG_CACHE_HOME": f"{tmp}/cache"}
+        >>> with mock.patch.dict(os.environ, cache_home):
+        ...     with ThreadPoolExecutor(8) as executor:
+        ...         _ = list(executor.map(submit, range(64)))
+        >>> cache_dir = f"{tmp}/cache/easy_slurm/archives"
+        >>> 0 < len(os.listdir(cache_dir)) <= ARCHIVE_CACHE_SIZE
+        True
+        >>> shutil.rmtree(tmp)
+    """
+    cache_dir = os.path.dirname(cached)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        os.link(path, cached)
+        _prune_archive_cache(cache_dir)
+    except OSError:
+        pass
+
+
+def _prune_archive_cache(cache_dir: str):
+    entries = []
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            try:
+                if entry.is_file():
+                    entries.append((entry.stat().st_mtime_ns, entry.path))
+            except FileNotFoundError:
+                continue  # Removed by a concurrent prune.
+    entries.sort(reverse=True)
+    for _, path in entries[ARCHIVE_CACHE_SIZE:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def clear_archive_cache():
+    """Removes all cached `src`/`assets` archives.
+
+    Archives already linked into job directories are unaffected.
+    """
+    shutil.rmtree(_archive_cache_dir(), ignore_errors=True)
+
+
+def _archive_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(
+        "~/.cache"
     )
+    return f"{cache_home}/easy_slurm/archives"
+
+
+class _OnceMemo:
+    """Memo that computes each key's value once, even across threads.
+
+    Concurrent callers of the same key wait for the first one's result,
+    instead of each computing it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: dict[Hashable, Future] = {}
+
+    def get(self, key: Hashable, func: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            future = self._futures.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self._futures[key] = Future()
+        if is_owner:
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        return future.result()
+
+
+def _dir_fingerprint(path: str, *extra: str) -> str:
+    """Hashes directory tree metadata (paths, modes, sizes, mtimes)."""
+    h = hashlib.blake2b(digest_size=16)
+    for x in (path, *extra):
+        h.update(f"{x}\0".encode())
+
+    stack = [path]
+    while stack:
+        dir_path = stack.pop()
+        with os.scandir(dir_path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        for entry in entries:
+            st = entry.stat(follow_symlinks=False)
+            rel_path = os.path.relpath(entry.path, path)
+            h.update(
+                f"{rel_path}\0{st.st_mode}\0{st.st_size}\0"
+                f"{st.st_mtime_ns}\0".encode()
+            )
+            if entry.is_symlink():
+                h.update(f"{os.readlink(entry.path)}\0".encode())
+            elif entry.is_dir():
+                stack.append(entry.path)
+
+    return h.hexdigest()
 
 
 def _write_script(filename: str, text: str):
-    with open(filename, "w") as f:
-        print(text, file=f)
+    _write_file(filename, f"{text}\n", mode=0o755, executable=True)
 
-    st = os.stat(filename)
-    os.chmod(filename, st.st_mode | stat.S_IEXEC)
+
+def _write_file(
+    filename: str, text: str, mode: int = 0o666, executable: bool = False
+):
+    """Writes file (normally in a single write) with given mode."""
+    fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        data = memoryview(text.encode())
+        while data:
+            # Retry short writes, e.g. on a filesystem near its quota.
+            data = data[os.write(fd, data) :]
+        if executable:
+            # The mode only applies on creation, so an existing file may
+            # still lack the exec bit. Fix it via the open fd.
+            st_mode = os.fstat(fd).st_mode
+            if not st_mode & stat.S_IEXEC:
+                os.fchmod(fd, st_mode | stat.S_IEXEC)
+    finally:
+        os.close(fd)
 
 
 def _sbatch_options_to_str(
     sbatch_options: dict[str, Any], job_dir: str, cleanup_seconds: int
 ) -> str:
-    sbatch_options = dict(sbatch_options)
-    sbatch_options["output"] = f"{job_dir}/slurm_jobid%j_%x.out"
-    sbatch_options["signal"] = f"B:USR1@{cleanup_seconds}"
-    return "\n".join(f"#SBATCH --{k}={v}" for k, v in sbatch_options.items())
+    lines = [
+        f"#SBATCH --{k}={v}"
+        for k, v in sbatch_options.items()
+        if k not in ("output", "signal")
+    ]
+    lines.append(f"#SBATCH --output={job_dir}/slurm_jobid%j_%x.out")
+    lines.append(f"#SBATCH --signal=B:USR1@{cleanup_seconds}")
+    return "\n".join(lines)
 
 
 def _quote_single_quotes(s: str) -> str:
-    """Replaces ' with '"'"'."""
-    return s.replace("'", """'"'"'""")
+    """Replaces runs of ' with '"'...'"', e.g. '' with '"''"'.
+
+    Examples:
+        >>> print(_quote_single_quotes("python main.py 'a b'"))
+        python main.py '"'"'a b'"'"'
+    """
+    return _SINGLE_QUOTES_RE.sub(lambda m: f"'\"{m.group(0)}\"'", s)
 
 
 def _fix_indent(x: str, level: int = 0) -> str:
-    return indent(dedent(x.strip("\n")), "  " * level).rstrip("\n")
+    r"""Dedents x, then indents it by `level` two-space steps.
+
+    Examples:
+        >>> x = "\n    if true; then\n      echo hi\n    fi\n"
+        >>> print(_fix_indent(x, 1))
+          if true; then
+            echo hi
+          fi
+    """
+    lines = x.strip("\n").split("\n")
+    margins = [
+        line[: len(line) - len(line.lstrip(" \t"))]
+        for line in lines
+        if line.strip(" \t")
+    ]
+    margin_len = len(os.path.commonprefix(margins))
+    prefix = "  " * level
+    return "\n".join(
+        f"{prefix}{line[margin_len:]}" if line.strip(" \t") else ""
+        for line in lines
+    ).rstrip("\n")
@@ -1,35 +1,60 @@
 import os as _os
+from functools import lru_cache as _lru_cache
+from string import Template as _Template
 
 
-def _format_template(s: str) -> str:
-    return (
-        s.strip("\n")
-        .replace("{{", "<LBRACE>")
-        .replace("}}", "<RBRACE>")
-        .replace("{", "{{")
-        .replace("}", "}}")
-        .replace("<LBRACE>", "{")
-        .replace("<RBRACE>", "}")
+class _ShellTemplate(_Template):
+    """Template with `{{name}}` placeholders.
+
+    Unlike `str.format`, all other braces (e.g. bash's `${VAR}`) are left
+    as is, so template files need no escaping.
+    """
+
+    pattern = r"""
+    \{\{(?:
+      (?P<named>[_a-z][_a-z0-9]*)\}\} |
+      (?P<braced>(?!)) |
+      (?P<escaped>(?!)) |
+      (?P<invalid>)
     )
+    """
 
 
 _dir_path = _os.path.dirname(_os.path.realpath(__file__))
 
-with open(_os.path.join(_dir_path, "job.sh")) as _f:
-    JOB_SCRIPT_TEMPLATE = _f.read()
 
-JOB_SCRIPT_TEMPLATE = _format_template(JOB_SCRIPT_TEMPLATE)
+_TEMPLATE_FILENAMES = {
+    "JOB_SCRIPT_TEMPLATE": "job.sh",
+    "JOB_INTERACTIVE_TEMPLATE": "job_interactive.sh",
+    "JOB_ARRAY_TEMPLATE": "job_array.sh",
+}
+
+
+@_lru_cache(maxsize=None)
+def _read_template(filename: str) -> _ShellTemplate:
+    with open(_os.path.join(_dir_path, filename)) as f:
+        return _ShellTemplate(f.read().strip("\n"))
+
 
-with open(_os.path.join(_dir_path, "job_interactive.sh")) as _f:
-    JOB_INTERACTIVE_TEMPLATE = _f.read()
+def __getattr__(name: str) -> _ShellTemplate:
+    # Template files are read on first access rather than at import.
+    try:
+        filename = _TEMPLATE_FILENAMES[name]
+    except KeyError:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}"
+        ) from None
+    return _read_template(filename)
 
-JOB_INTERACTIVE_TEMPLATE = _format_template(JOB_INTERACTIVE_TEMPLATE)
 
 VARS_TEMPLATE = r"""
 EASY_SLURM_VERSION={easy_slurm_version}
 JOB_DIR={job_dir}
 DATASET_PATH={dataset_path}
 RESUBMIT_LIMIT={resubmit_limit}
+ARCHIVE_EXT={archive_ext}
+MULTINODE={multinode}
+DATASET_ASYNC={dataset_async}
 """
 
 VARS_TEMPLATE = VARS_TEMPLATE.strip("\n")
@@ -46,7 +71,7 @@ EXTRACT_RESULTS = {
     """,
     "targz": r"""
         if [ "$IS_FIRST_RUN" = false ]; then
-          tar xf "$JOB_DIR/results.tar.gz"
+          tar -I "$GZIP_PROG" -xf "$JOB_DIR/results.tar.gz"
         fi
         mkdir -p "$SLURM_TMPDIR/results"
     """,
@@ -56,12 +81,13 @@ EXTRACT_RESULTS = {k: v.strip("\n") for k, v in EXTRACT_RESULTS.items()}
 
 SAVE_RESULTS = {
     "rsync": r"""
-        rsync -a --compress --partial "$SLURM_TMPDIR/results/" "$JOB_DIR/results/"
+        rsync -a --inplace --no-whole-file --partial --info=stats2 \
+          "$SLURM_TMPDIR/results/" "$JOB_DIR/results/"
     """,
     "symlink": r"""
     """,
     "targz": r"""
-        tar czf results.tar.gz results
+        tar -I "$GZIP_PROG" -cf results.tar.gz results
         mv results.tar.gz "$JOB_DIR/"
     """,
 }
@@ -10,7 +10,15 @@ on_run_resume='{{on_run_resume}}'
 IS_INTERRUPTED=false
 IS_FIRST_RUN=false
 IS_INTERACTIVE=false
+DATASET_PID=""
 RESUBMIT_COUNT=0
+FORCE_KILL_SECONDS="${FORCE_KILL_SECONDS:-30}"
+
+if command -v pigz > /dev/null; then
+  GZIP_PROG="pigz -p ${SLURM_CPUS_ON_NODE:-4}"
+else
+  GZIP_PROG="gzip"
+fi
 
 begin_func() {
   local func_name="$1"
@@ -45,17 +53,29 @@ save_results() {
 }
 
 status_write() {
-  local status_file="$JOB_DIR/status"
-  echo "status=$1" > "$status_file"
-  echo "easy_slurm_version=$EASY_SLURM_VERSION" >> "$status_file"
-  echo "resubmit_count=$RESUBMIT_COUNT" >> "$status_file"
+  # Every state is recorded node-locally. Only phase boundaries (and
+  # interrupts) are published to the shared filesystem.
+  local status_str
+  printf -v status_str "%s\n" "status=$1" \
+    "easy_slurm_version=$EASY_SLURM_VERSION" "resubmit_count=$RESUBMIT_COUNT"
+  printf "%s" "$status_str" > "$SLURM_TMPDIR/status"
+  case "$1" in
+    initializing|interrupting|finalizing|completed|incomplete)
+      printf "%s" "$status_str" > "$JOB_DIR/status"
+      ;;
+  esac
 }
 
 handle_interrupt() {
   status_write "interrupting"
   echo ">>> Call handle_interrupt at $(date)"
   local PROG_PID="$(< "$SLURM_TMPDIR/prog.pid")"
-  kill -TERM "$PROG_PID"
+  # Signal the whole process group, and force kill it if it lingers.
+  kill -TERM -- "-$PROG_PID" 2> /dev/null
+  set -m
+  ( sleep "$FORCE_KILL_SECONDS"; kill -KILL -- "-$PROG_PID" 2> /dev/null ) &
+  FORCE_KILL_PID=$!
+  set +m
   IS_INTERRUPTED=true
 }
 
@@ -79,25 +99,104 @@ parse_args() {
 }
 
 init_vars() {
-  local status_file="$JOB_DIR/status"
-  if grep -q 'status\s*=\s*new' "$status_file"; then
-    IS_FIRST_RUN=true
-  elif grep -q 'status\s*=\s*incomplete' "$status_file"; then
-    IS_FIRST_RUN=false
-  else
-    echo "Status not new or incomplete."
-    exit 1
-  fi
-  RESUBMIT_COUNT="$(sed -n 's/^resubmit_count=\(.*\)$/\1/p' "$status_file")"
+  # Parse status file in a single read, using only shell builtins.
+  local key value status
+  while IFS="=" read -r key value; do
+    case "$key" in
+      status) status="$value" ;;
+      resubmit_count) RESUBMIT_COUNT="$value" ;;
+    esac
+  done < "$JOB_DIR/status"
+  case "$status" in
+    new) IS_FIRST_RUN=true ;;
+    incomplete) IS_FIRST_RUN=false ;;
+    *)
+      echo "Status not new or incomplete."
+      exit 1
+      ;;
+  esac
 }
 
 extract_data() {
   begin_func "extract_data" "$SLURM_TMPDIR"
-  tar xf "$JOB_DIR/assets.tar.gz"
-  tar xf "$JOB_DIR/src.tar.gz"
+  if [ "$MULTINODE" = true ]; then
+    extract_data_multinode || exit 1
+    return
+  fi
+  # Extract dataset in background, overlapping with src/assets extraction
+  # (and with setup, if DATASET_ASYNC).
+  extract_dataset &
+  DATASET_PID=$!
+  local archive
+  for archive in "$JOB_DIR/assets$ARCHIVE_EXT" "$JOB_DIR/src$ARCHIVE_EXT"; do
+    if [ -f "$archive" ]; then
+      extract_archive "$archive" || exit 1
+    fi
+  done
+}
+
+extract_dataset() {
+  [ -n "$DATASET_PATH" ] || return 0
   mkdir -p "$SLURM_TMPDIR/datasets"
   cd "$SLURM_TMPDIR/datasets" || exit 1
-  tar xf "$DATASET_PATH"
+  extract_archive "$DATASET_PATH"
+}
+
+extract_archive() {
+  if [[ "$1" == *.tar.zst ]] && ! command -v zstd > /dev/null; then
+    echo ">>> Error: zstd is required to extract $1" >&2
+    return 1
+  fi
+  # Decompress in a separate process, overlapping read and extraction.
+  (
+    set -o pipefail
+    case "$1" in
+      *.tar.gz|*.tgz) $GZIP_PROG -dc "$1" | tar xf - ;;
+      *.tar.zst) zstd -dc "$1" | tar xf - ;;
+      *) tar xf "$1" ;;
+    esac
+  ) || {
+    echo ">>> Error: failed to extract $1" >&2
+    return 1
+  }
+}
+
+wait_dataset() {
+  if [ -n "$DATASET_PID" ]; then
+    begin_func "wait_dataset" "$SLURM_TMPDIR"
+    wait "$DATASET_PID" || exit 1
+    DATASET_PID=""
+  fi
+}
+
+extract_data_multinode() {
+  # Broadcast archives to every node once, then extract node-locally.
+  local dataset_name="${DATASET_PATH##*/}"
+  local name
+  for name in "assets$ARCHIVE_EXT" "src$ARCHIVE_EXT"; do
+    if [ -f "$JOB_DIR/$name" ]; then
+      sbcast -f "$JOB_DIR/$name" "$SLURM_TMPDIR/$name" || return 1
+    fi
+  done
+  if [ -n "$DATASET_PATH" ]; then
+    sbcast -f "$DATASET_PATH" "$SLURM_TMPDIR/$dataset_name" || return 1
+  fi
+  srun --ntasks="$SLURM_JOB_NUM_NODES" --ntasks-per-node=1 bash -c '
+    set -e
+    cd "$SLURM_TMPDIR"
+    for archive in "assets$1" "src$1"; do
+      if [ -f "$archive" ]; then
+        tar xf "$archive"
+        rm -f "$archive"
+      fi
+    done
+    mkdir -p datasets
+    cd datasets
+    if [ -n "$2" ] && [ -f "../$2" ]; then
+      tar xf "../$2"
+      rm -f "../$2"
+    fi
+  ' _ "$ARCHIVE_EXT" "$dataset_name"
 }
 
 run_setup() {
@@ -119,14 +218,24 @@ run() {
   else
     cmd="$on_run_resume"
   fi
-  eval "$cmd &"
-  echo $! > "$SLURM_TMPDIR/prog.pid"
-  wait
+  # Run in its own process group (job control), exec'd directly so
+  # that the PID is the program itself rather than a wrapper shell.
+  set -m
+  ( eval "exec $cmd" ) &
+  local PROG_PID=$!
+  set +m
+  echo "$PROG_PID" > "$SLURM_TMPDIR/prog.pid"
+  wait "$PROG_PID"
+  if [ "$IS_INTERRUPTED" = true ]; then
+    # The trap interrupts the first wait, so wait again for shutdown.
+    wait "$PROG_PID"
+    kill -- "-$FORCE_KILL_PID" 2> /dev/null
+  fi
 }
 
 resubmit_job() {
-  local RESULT="$(sbatch "$JOB_DIR/job.sh")"
-  local JOB_ID="$(sed 's/^Submitted batch job \([0-9]\+\)$/\1/' <<< "$RESULT")"
+  local RESULT="$(sbatch --parsable "$JOB_DIR/job.sh")"
+  local JOB_ID="${RESULT%%;*}"
   echo "$JOB_ID" >> "$JOB_DIR/job_ids"
   RESUBMIT_COUNT="$(( RESUBMIT_COUNT + 1 ))"
 }
@@ -148,7 +257,11 @@ initialize() {
   status_write "initializing"
   extract_results
   extract_data
+  if [ "$DATASET_ASYNC" != true ]; then
+    wait_dataset
+  fi
   run_setup
+  wait_dataset
 }
 
 finalize() {
@@ -0,0 +1,5 @@
+#!/bin/bash
+
+JOB_DIR={{job_dir}}
+
+exec "$JOB_DIR/tasks/$SLURM_ARRAY_TASK_ID/job.sh"
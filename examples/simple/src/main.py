@@ -3,6 +3,10 @@ from time import sleep
 
 import yaml
 
+# Use the libyaml parser and emitter if available.
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 def parse_args():
     parser = ArgumentParser()
@@ -15,11 +19,11 @@ def main():
     args = parse_args()
 
     with open("../assets/hparams.yaml") as f:
-        hparams = yaml.safe_load(f)
+        hparams = yaml.load(f, Loader=_Loader)
 
     if args.resume:
         with open("../results/state_dict.yaml") as f:
-            state_dict = yaml.safe_load(f)
+            state_dict = yaml.load(f, Loader=_Loader)
     else:
         state_dict = {"epoch": 0}
 
@@ -32,7 +36,7 @@ def main():
         state_dict["epoch"] = epoch + 1
 
         with open("../results/state_dict.yaml", "w") as f:
-            yaml.safe_dump(state_dict, f)
+            yaml.dump(state_dict, f, Dumper=_Dumper)
 
         sleep(5)
 
@@ -2,10 +2,13 @@ import yaml
 
 import easy_slurm
 
+# Use the libyaml parser if available.
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 
 def main():
     with open("job.yaml") as f:
-        job_config = yaml.safe_load(f)
+        job_config = yaml.load(f, Loader=_Loader)
 
     easy_slurm.submit_job(**job_config)
 